@@ -12,10 +12,16 @@ class TokenError(ValueError):
     pass
 
 
-def create_token(user_id: int, secret: str, ttl_seconds: int) -> str:
+def create_token(
+    user_id: int,
+    secret: str,
+    ttl_seconds: int,
+    scope: str = "user",
+) -> str:
     header = {"alg": "HS256", "typ": "JWT"}
     payload = {
         "sub": str(user_id),
+        "scope": scope,
         "exp": int(time.time()) + ttl_seconds,
     }
     header_b64 = _b64url_encode(json.dumps(header, separators=(",", ":")).encode())
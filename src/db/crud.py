@@ -1,11 +1,199 @@
-from sqlalchemy import select
+from collections.abc import AsyncIterator, Sequence
+from datetime import datetime
+
+from sqlalchemy import Float, Integer, delete, func, select, text, tuple_
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.db.models import CircleRecord
+from src.db.models import SEARCH_CONFIG, ChatCell, CircleRecord, UserVersion
+from src.geo import MAX_LATITUDE, tile_bounds, tile_cell, tile_range
+
+
+CLUSTER_MAX_ZOOM = 18
+
+CHAT_CELLS_SELECT_SQL = """
+SELECT chatid, zoom, x, y, count(*) AS count, sum(lat) AS latsum, sum(lon) AS lonsum
+FROM (
+    SELECT
+        points.chatid,
+        zooms.zoom,
+        LEAST(
+            floor((points.lon + 180) / 360 * (1 << zooms.zoom))::int,
+            (1 << zooms.zoom) - 1
+        ) AS x,
+        LEAST(GREATEST(
+            floor(
+                (1 - ln(tan(radians(points.clat)) + 1 / cos(radians(points.clat)))
+                / pi()) / 2 * (1 << zooms.zoom)
+            )::int,
+            0
+        ), (1 << zooms.zoom) - 1) AS y,
+        points.lat,
+        points.lon
+    FROM (
+        SELECT
+            chatid,
+            (location->>'lat')::double precision AS lat,
+            (location->>'lon')::double precision AS lon,
+            LEAST(
+                GREATEST(
+                    (location->>'lat')::double precision,
+                    -CAST(:max_lat AS double precision)
+                ),
+                CAST(:max_lat AS double precision)
+            ) AS clat
+        FROM {source}
+        WHERE chatid IS NOT NULL
+            AND jsonb_typeof(location->'lat') = 'number'
+            AND jsonb_typeof(location->'lon') = 'number'
+    ) AS points
+    CROSS JOIN generate_series(0, CAST(:max_zoom AS integer)) AS zooms(zoom)
+) AS cells
+GROUP BY chatid, zoom, x, y
+"""
+
+MVT_TILE_SQL = """
+WITH points AS (
+    SELECT
+        id,
+        type,
+        to_char(data AT TIME ZONE 'UTC', 'YYYY-MM-DD"T"HH24:MI:SS"+00:00"') AS data,
+        username,
+        description,
+        (location->>'lat')::double precision AS lat,
+        (location->>'lon')::double precision AS lon
+    FROM circle_records
+    WHERE userid = :user_id
+        AND (location->>'lat')::double precision BETWEEN :south AND :north
+        AND (location->>'lon')::double precision BETWEEN :west AND :east
+),
+features AS (
+    SELECT
+        id AS fid,
+        id,
+        type,
+        data,
+        username,
+        description,
+        ST_AsMVTGeom(
+            ST_Transform(ST_SetSRID(ST_MakePoint(lon, lat), 4326), 3857),
+            ST_TileEnvelope(:zoom, :x, :y),
+            :extent,
+            64,
+            true
+        ) AS geom
+    FROM points
+)
+SELECT ST_AsMVT(features.*, :layer, :extent, 'geom', 'fid')
+FROM features
+WHERE geom IS NOT NULL
+"""
+
+BATCH_DELETE_SQL = """
+WITH deleted AS (
+    DELETE FROM circle_records
+    WHERE id = ANY(CAST(:ids AS integer[])) AND userid = :user_id
+    RETURNING id, chatid, location
+),
+changed AS (
+    INSERT INTO chat_cells (chatid, zoom, x, y, count, latsum, lonsum)
+    SELECT chatid, zoom, x, y, -count, -latsum, -lonsum
+    FROM ({cells}) AS added
+    ON CONFLICT (chatid, zoom, x, y) DO UPDATE SET
+        count = chat_cells.count + excluded.count,
+        latsum = chat_cells.latsum + excluded.latsum,
+        lonsum = chat_cells.lonsum + excluded.lonsum
+    RETURNING chat_cells.chatid, chat_cells.zoom, chat_cells.x, chat_cells.y, chat_cells.count
+),
+emptied AS (
+    SELECT chatid, zoom, x, y FROM changed WHERE count <= 0
+)
+SELECT
+    ARRAY(SELECT id FROM deleted) AS ids,
+    ARRAY(SELECT chatid FROM emptied ORDER BY chatid, zoom, x, y) AS chats,
+    ARRAY(SELECT zoom FROM emptied ORDER BY chatid, zoom, x, y) AS zooms,
+    ARRAY(SELECT x FROM emptied ORDER BY chatid, zoom, x, y) AS xs,
+    ARRAY(SELECT y FROM emptied ORDER BY chatid, zoom, x, y) AS ys
+""".format(cells=CHAT_CELLS_SELECT_SQL.format(source="deleted"))
+
+DELETE_EMPTY_CELLS_SQL = """
+DELETE FROM chat_cells
+USING unnest(
+    CAST(:chats AS bigint[]),
+    CAST(:zooms AS smallint[]),
+    CAST(:xs AS integer[]),
+    CAST(:ys AS integer[])
+) AS emptied(chatid, zoom, x, y)
+WHERE chat_cells.chatid = emptied.chatid
+    AND chat_cells.zoom = emptied.zoom
+    AND chat_cells.x = emptied.x
+    AND chat_cells.y = emptied.y
+    AND chat_cells.count <= 0
+"""
+
+BATCH_DESCRIPTION_SQL = """
+UPDATE circle_records AS records
+SET description = updates.description
+FROM unnest(CAST(:ids AS integer[]), CAST(:descriptions AS text[]))
+    AS updates(id, description)
+WHERE records.id = updates.id AND records.userid = :user_id
+RETURNING records.id, records.description
+"""
+
+IMPORT_SQL = """
+WITH inserted AS (
+    INSERT INTO circle_records
+        (userid, chatid, data, location, type, mediaid, username, description)
+    SELECT DISTINCT ON (userid, mediaid, data)
+        userid,
+        chatid,
+        COALESCE(data, now()),
+        location,
+        type,
+        mediaid,
+        username,
+        COALESCE(description, '')
+    FROM circle_import AS staged
+    WHERE NOT EXISTS (
+        SELECT 1 FROM circle_records AS existing
+        WHERE existing.userid = staged.userid
+            AND existing.mediaid = staged.mediaid
+            AND existing.data = staged.data
+    )
+    RETURNING userid, chatid, location
+),
+versions AS (
+    INSERT INTO user_versions (userid, version)
+    SELECT DISTINCT userid, 1 FROM inserted
+    ON CONFLICT (userid) DO UPDATE SET version = user_versions.version + 1
+),
+changed AS (
+    INSERT INTO chat_cells (chatid, zoom, x, y, count, latsum, lonsum)
+    {cells}
+    ON CONFLICT (chatid, zoom, x, y) DO UPDATE SET
+        count = chat_cells.count + excluded.count,
+        latsum = chat_cells.latsum + excluded.latsum,
+        lonsum = chat_cells.lonsum + excluded.lonsum
+)
+SELECT count(*) FROM inserted
+""".format(cells=CHAT_CELLS_SELECT_SQL.format(source="inserted"))
+
+IMPORT_COLUMNS = (
+    "userid",
+    "chatid",
+    "data",
+    "location",
+    "type",
+    "mediaid",
+    "username",
+    "description",
+)
 
 
 async def create_circle(session: AsyncSession, record: CircleRecord) -> CircleRecord:
     session.add(record)
+    await _apply_chat_cells(session, record, 1)
+    await bump_user_version(session, record.user_id)
     await session.commit()
     await session.refresh(record)
     return record
@@ -18,14 +206,370 @@ async def get_circle(session: AsyncSession, record_id: int) -> CircleRecord | No
 async def list_circles(
     session: AsyncSession,
     user_id: int | None = None,
+    search: str | None = None,
+    date_from: datetime | None = None,
+    date_before: datetime | None = None,
+    media_type: str | None = None,
 ) -> list[CircleRecord]:
     query = select(CircleRecord).order_by(CircleRecord.data.desc())
     if user_id is not None:
         query = query.where(CircleRecord.user_id == user_id)
+    if search:
+        query = query.where(
+            CircleRecord.search.match(search, postgresql_regconfig=SEARCH_CONFIG)
+        )
+    if date_from is not None:
+        query = query.where(CircleRecord.data >= date_from)
+    if date_before is not None:
+        query = query.where(CircleRecord.data < date_before)
+    if media_type is not None:
+        query = query.where(CircleRecord.type == media_type)
     result = await session.execute(query)
     return list(result.scalars())
 
 
+async def stream_circles(
+    session: AsyncSession,
+    user_id: int | None = None,
+    batch_size: int = 1000,
+) -> AsyncIterator[CircleRecord]:
+    query = (
+        select(CircleRecord)
+        .order_by(CircleRecord.id)
+        .execution_options(yield_per=batch_size)
+    )
+    if user_id is not None:
+        query = query.where(CircleRecord.user_id == user_id)
+    result = await session.stream_scalars(query)
+    async for record in result:
+        yield record
+
+
+async def import_circles(session: AsyncSession, rows: Sequence[tuple]) -> int:
+    if not rows:
+        return 0
+    conn = await session.connection()
+    await conn.execute(
+        text(
+            "CREATE TEMP TABLE IF NOT EXISTS circle_import ("
+            "userid BIGINT, chatid BIGINT, data TIMESTAMPTZ, location JSONB, "
+            "type VARCHAR(32), mediaid VARCHAR(256), username VARCHAR(128), "
+            "description TEXT"
+            ") ON COMMIT DELETE ROWS"
+        )
+    )
+    raw = await conn.get_raw_connection()
+    await raw.driver_connection.copy_records_to_table(
+        "circle_import",
+        records=rows,
+        columns=IMPORT_COLUMNS,
+    )
+    result = await conn.execute(
+        text(IMPORT_SQL),
+        {"max_lat": MAX_LATITUDE, "max_zoom": CLUSTER_MAX_ZOOM},
+    )
+    await conn.execute(text("TRUNCATE circle_import"))
+    return result.scalar() or 0
+
+
 async def delete_circle(session: AsyncSession, record: CircleRecord) -> None:
     await session.delete(record)
+    await _apply_chat_cells(session, record, -1)
+    await bump_user_version(session, record.user_id)
     await session.commit()
+
+
+async def update_circle_description(
+    session: AsyncSession,
+    record: CircleRecord,
+    description: str,
+) -> CircleRecord:
+    record.description = description
+    await bump_user_version(session, record.user_id)
+    await session.commit()
+    return record
+
+
+async def delete_circles(
+    session: AsyncSession,
+    user_id: int,
+    ids: Sequence[int],
+) -> set[int]:
+    result = await session.execute(
+        text(BATCH_DELETE_SQL),
+        {
+            "ids": list(ids),
+            "user_id": user_id,
+            "max_lat": MAX_LATITUDE,
+            "max_zoom": CLUSTER_MAX_ZOOM,
+        },
+    )
+    row = result.one()
+    deleted = set(row.ids)
+    if row.chats:
+        await session.execute(
+            text(DELETE_EMPTY_CELLS_SQL),
+            {"chats": row.chats, "zooms": row.zooms, "xs": row.xs, "ys": row.ys},
+        )
+    if deleted:
+        await bump_user_version(session, user_id)
+    await session.commit()
+    return deleted
+
+
+async def update_circle_descriptions(
+    session: AsyncSession,
+    user_id: int,
+    descriptions: dict[int, str],
+) -> dict[int, str]:
+    result = await session.execute(
+        text(BATCH_DESCRIPTION_SQL),
+        {
+            "ids": list(descriptions),
+            "descriptions": list(descriptions.values()),
+            "user_id": user_id,
+        },
+    )
+    updated = {row.id: row.description for row in result}
+    if updated:
+        await bump_user_version(session, user_id)
+    await session.commit()
+    return updated
+
+
+async def existing_circle_ids(session: AsyncSession, ids: Sequence[int]) -> set[int]:
+    if not ids:
+        return set()
+    result = await session.execute(
+        select(CircleRecord.id).where(CircleRecord.id.in_(ids))
+    )
+    return set(result.scalars())
+
+
+async def get_user_version(session: AsyncSession, user_id: int) -> int:
+    result = await session.execute(
+        select(UserVersion.version).where(UserVersion.user_id == user_id)
+    )
+    return result.scalar() or 0
+
+
+async def bump_user_version(session: AsyncSession, user_id: int) -> None:
+    stmt = insert(UserVersion).values(user_id=user_id, version=1)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["userid"],
+        set_={"version": UserVersion.version + 1},
+    )
+    await session.execute(stmt)
+
+
+async def heatmap_cells(
+    session: AsyncSession,
+    user_id: int,
+    zoom: int,
+    cells: tuple[int, int, int, int],
+) -> list[tuple[int, int, int]]:
+    min_x, min_y, max_x, max_y = cells
+    west, _, _, north = tile_bounds(min_x, min_y, zoom)
+    _, south, east, _ = tile_bounds(max_x, max_y, zoom)
+    lat = CircleRecord.location["lat"].astext.cast(Float)
+    lon = CircleRecord.location["lon"].astext.cast(Float)
+    scale = float(1 << zoom)
+    clamped_lat = func.radians(
+        func.least(func.greatest(lat, -MAX_LATITUDE), MAX_LATITUDE),
+        type_=Float,
+    )
+    mercator = func.ln(
+        func.tan(clamped_lat, type_=Float) + 1.0 / func.cos(clamped_lat, type_=Float),
+        type_=Float,
+    ) / func.pi(type_=Float)
+    x = func.least(func.floor((lon + 180.0) / 360.0 * scale), scale - 1).cast(Integer)
+    y = func.least(
+        func.greatest(func.floor((1.0 - mercator) / 2.0 * scale), 0.0),
+        scale - 1,
+    ).cast(Integer)
+    query = (
+        select(x.label("x"), y.label("y"), func.count().label("count"))
+        .where(
+            CircleRecord.user_id == user_id,
+            lat.between(south, north),
+            lon.between(west, east),
+            x.between(min_x, max_x),
+            y.between(min_y, max_y),
+        )
+        .group_by("x", "y")
+    )
+    result = await session.execute(query)
+    return [(row.x, row.y, row.count) for row in result]
+
+
+async def timeline_counts(
+    session: AsyncSession,
+    user_id: int,
+    bucket: str,
+) -> list[tuple[datetime, int]]:
+    period = func.date_trunc(bucket, func.timezone("UTC", CircleRecord.data))
+    query = (
+        select(period.label("period"), func.count().label("count"))
+        .where(CircleRecord.user_id == user_id)
+        .group_by("period")
+        .order_by("period")
+    )
+    result = await session.execute(query)
+    return [(row.period, row.count) for row in result]
+
+
+async def count_circles(session: AsyncSession, user_id: int) -> int:
+    result = await session.execute(
+        select(func.count()).where(CircleRecord.user_id == user_id)
+    )
+    return result.scalar() or 0
+
+
+async def list_circles_in_bbox(
+    session: AsyncSession,
+    user_id: int,
+    bbox: tuple[float, float, float, float],
+) -> list[CircleRecord]:
+    west, south, east, north = bbox
+    lat = CircleRecord.location["lat"].astext.cast(Float)
+    lon = CircleRecord.location["lon"].astext.cast(Float)
+    query = select(CircleRecord).where(
+        CircleRecord.user_id == user_id,
+        lat.between(south, north),
+        lon.between(west, east),
+    )
+    result = await session.execute(query)
+    return list(result.scalars())
+
+
+async def postgis_available(session: AsyncSession) -> bool:
+    result = await session.execute(
+        text("SELECT EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'postgis')")
+    )
+    return bool(result.scalar())
+
+
+async def postgis_tile(
+    session: AsyncSession,
+    user_id: int,
+    zoom: int,
+    x: int,
+    y: int,
+    bbox: tuple[float, float, float, float],
+    layer: str,
+    extent: int,
+) -> bytes:
+    west, south, east, north = bbox
+    result = await session.execute(
+        text(MVT_TILE_SQL),
+        {
+            "user_id": user_id,
+            "zoom": zoom,
+            "x": x,
+            "y": y,
+            "west": west,
+            "south": south,
+            "east": east,
+            "north": north,
+            "layer": layer,
+            "extent": extent,
+        },
+    )
+    return result.scalar() or b""
+
+
+async def list_chat_circles(
+    session: AsyncSession,
+    chat_id: int,
+    bbox: tuple[float, float, float, float],
+    limit: int,
+) -> list[CircleRecord]:
+    west, south, east, north = bbox
+    lat = CircleRecord.location["lat"].astext.cast(Float)
+    lon = CircleRecord.location["lon"].astext.cast(Float)
+    query = (
+        select(CircleRecord)
+        .where(
+            CircleRecord.chat_id == chat_id,
+            lat.between(south, north),
+            lon.between(west, east),
+        )
+        .order_by(CircleRecord.data.desc())
+        .limit(limit)
+    )
+    result = await session.execute(query)
+    return list(result.scalars())
+
+
+async def list_chat_clusters(
+    session: AsyncSession,
+    chat_id: int,
+    zoom: int,
+    bbox: tuple[float, float, float, float],
+) -> list[ChatCell]:
+    zoom = max(0, min(zoom, CLUSTER_MAX_ZOOM))
+    min_x, min_y, max_x, max_y = tile_range(bbox, zoom)
+    query = select(ChatCell).where(
+        ChatCell.chat_id == chat_id,
+        ChatCell.zoom == zoom,
+        ChatCell.x.between(min_x, max_x),
+        ChatCell.y.between(min_y, max_y),
+        ChatCell.count > 0,
+    )
+    result = await session.execute(query)
+    return list(result.scalars())
+
+
+def record_point(location: dict | None) -> tuple[float, float] | None:
+    if not isinstance(location, dict):
+        return None
+    lat = location.get("lat")
+    lon = location.get("lon")
+    if not isinstance(lat, (int, float)) or not isinstance(lon, (int, float)):
+        return None
+    return float(lat), float(lon)
+
+
+async def _apply_chat_cells(
+    session: AsyncSession,
+    record: CircleRecord,
+    sign: int,
+) -> None:
+    point = record_point(record.location)
+    if record.chat_id is None or point is None:
+        return
+    lat, lon = point
+    rows = []
+    for zoom in range(CLUSTER_MAX_ZOOM + 1):
+        x, y = tile_cell(lat, lon, zoom)
+        rows.append(
+            {
+                "chat_id": record.chat_id,
+                "zoom": zoom,
+                "x": x,
+                "y": y,
+                "count": sign,
+                "lat_sum": lat * sign,
+                "lon_sum": lon * sign,
+            }
+        )
+    stmt = insert(ChatCell).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["chatid", "zoom", "x", "y"],
+        set_={
+            "count": ChatCell.count + stmt.excluded["count"],
+            "latsum": ChatCell.lat_sum + stmt.excluded.latsum,
+            "lonsum": ChatCell.lon_sum + stmt.excluded.lonsum,
+        },
+    )
+    await session.execute(stmt)
+    if sign < 0:
+        await session.execute(
+            delete(ChatCell).where(
+                ChatCell.chat_id == record.chat_id,
+                ChatCell.count <= 0,
+                tuple_(ChatCell.zoom, ChatCell.x, ChatCell.y).in_(
+                    [(row["zoom"], row["x"], row["y"]) for row in rows]
+                ),
+            )
+        )
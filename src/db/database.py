@@ -2,10 +2,17 @@ from collections.abc import AsyncGenerator
 
 from sqlalchemy import text
 from sqlalchemy.engine.url import make_url
-from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.ext.asyncio import (
+    AsyncConnection,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
 
 from src.config import settings
-from src.db.models import Base
+from src.db.crud import CHAT_CELLS_SELECT_SQL, CLUSTER_MAX_ZOOM
+from src.db.models import SEARCH_VECTOR_SQL, Base
+from src.geo import MAX_LATITUDE
 
 
 engine = create_async_engine(settings.database_url, echo=False)
@@ -37,9 +44,16 @@ async def ensure_database_exists() -> None:
         await maintenance_engine.dispose()
 
 
+START_LOCK_KEY = 0x6D656D6F
+
+
 async def start_db() -> None:
     await ensure_database_exists()
     async with engine.begin() as conn:
+        await conn.execute(
+            text("SELECT pg_advisory_xact_lock(:key)"),
+            {"key": START_LOCK_KEY},
+        )
         await conn.run_sync(Base.metadata.create_all)
         await conn.execute(
             text(
@@ -47,6 +61,64 @@ async def start_db() -> None:
                 "ADD COLUMN IF NOT EXISTS username VARCHAR(128)"
             )
         )
+        await conn.execute(
+            text(
+                "ALTER TABLE circle_records "
+                "ADD COLUMN IF NOT EXISTS chatid BIGINT"
+            )
+        )
+        await conn.execute(
+            text(
+                "ALTER TABLE circle_records "
+                "ADD COLUMN IF NOT EXISTS search TSVECTOR "
+                f"GENERATED ALWAYS AS ({SEARCH_VECTOR_SQL}) STORED"
+            )
+        )
+        await conn.execute(
+            text(
+                "CREATE INDEX IF NOT EXISTS ix_circle_records_search "
+                "ON circle_records USING gin (search)"
+            )
+        )
+        await conn.execute(
+            text(
+                "CREATE INDEX IF NOT EXISTS ix_circle_records_userid_data "
+                "ON circle_records (userid, data)"
+            )
+        )
+        await conn.execute(
+            text(
+                "CREATE INDEX IF NOT EXISTS ix_circle_records_userid_mediaid "
+                "ON circle_records (userid, mediaid)"
+            )
+        )
+        await conn.execute(
+            text(
+                "CREATE INDEX IF NOT EXISTS ix_circle_records_chatid_lat "
+                "ON circle_records "
+                "(chatid, ((location->>'lat')::double precision))"
+            )
+        )
+        await _sync_chat_cells(conn)
+
+
+async def _sync_chat_cells(conn: AsyncConnection) -> None:
+    result = await conn.execute(
+        text(
+            "SELECT EXISTS (SELECT 1 FROM circle_records WHERE chatid IS NOT NULL) "
+            "AND NOT EXISTS (SELECT 1 FROM chat_cells)"
+        )
+    )
+    if not result.scalar():
+        return
+    await conn.execute(text("DELETE FROM chat_cells"))
+    await conn.execute(
+        text(
+            "INSERT INTO chat_cells (chatid, zoom, x, y, count, latsum, lonsum) "
+            + CHAT_CELLS_SELECT_SQL.format(source="circle_records")
+        ),
+        {"max_lat": MAX_LATITUDE, "max_zoom": CLUSTER_MAX_ZOOM},
+    )
 
 
 async def stop_db() -> None:
@@ -1,11 +1,24 @@
 from datetime import datetime
 
-from sqlalchemy import BigInteger, DateTime, String, Text
-from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy import (
+    BigInteger,
+    Computed,
+    DateTime,
+    Float,
+    Integer,
+    SmallInteger,
+    String,
+    Text,
+)
+from sqlalchemy.dialects.postgresql import JSONB, TSVECTOR
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
 from sqlalchemy.sql import func
 
 
+SEARCH_CONFIG = "simple"
+SEARCH_VECTOR_SQL = f"to_tsvector('{SEARCH_CONFIG}', coalesce(description, ''))"
+
+
 class Base(DeclarativeBase):
     pass
 
@@ -15,6 +28,12 @@ class CircleRecord(Base):
 
     id: Mapped[int] = mapped_column(primary_key=True)
     user_id: Mapped[int] = mapped_column("userid", BigInteger, index=True)
+    chat_id: Mapped[int | None] = mapped_column(
+        "chatid",
+        BigInteger,
+        nullable=True,
+        index=True,
+    )
     data: Mapped[datetime] = mapped_column(
         "data",
         DateTime(timezone=True),
@@ -25,3 +44,28 @@ class CircleRecord(Base):
     media_id: Mapped[str] = mapped_column("mediaid", String(256))
     username: Mapped[str | None] = mapped_column("username", String(128), nullable=True)
     description: Mapped[str] = mapped_column("description", Text, default="")
+    search: Mapped[str | None] = mapped_column(
+        "search",
+        TSVECTOR,
+        Computed(SEARCH_VECTOR_SQL, persisted=True),
+        deferred=True,
+    )
+
+
+class ChatCell(Base):
+    __tablename__ = "chat_cells"
+
+    chat_id: Mapped[int] = mapped_column("chatid", BigInteger, primary_key=True)
+    zoom: Mapped[int] = mapped_column("zoom", SmallInteger, primary_key=True)
+    x: Mapped[int] = mapped_column("x", Integer, primary_key=True)
+    y: Mapped[int] = mapped_column("y", Integer, primary_key=True)
+    count: Mapped[int] = mapped_column("count", Integer, default=0)
+    lat_sum: Mapped[float] = mapped_column("latsum", Float, default=0.0)
+    lon_sum: Mapped[float] = mapped_column("lonsum", Float, default=0.0)
+
+
+class UserVersion(Base):
+    __tablename__ = "user_versions"
+
+    user_id: Mapped[int] = mapped_column("userid", BigInteger, primary_key=True)
+    version: Mapped[int] = mapped_column("version", BigInteger, default=0)
@@ -0,0 +1,38 @@
+from src.geo.geojson import (
+    FEATURE_COLLECTION_FOOTER,
+    FEATURE_COLLECTION_HEADER,
+    dumps_feature,
+    feature_point,
+    loads_feature_line,
+    point_feature,
+)
+from src.geo.mvt import MVT_EXTENT, encode_point_layer
+from src.geo.tiles import (
+    MAX_LATITUDE,
+    clamp_bbox,
+    parse_bbox,
+    tile_bounds,
+    tile_cell,
+    tile_center,
+    tile_pixel,
+    tile_range,
+)
+
+__all__ = [
+    "FEATURE_COLLECTION_FOOTER",
+    "FEATURE_COLLECTION_HEADER",
+    "MAX_LATITUDE",
+    "MVT_EXTENT",
+    "clamp_bbox",
+    "dumps_feature",
+    "encode_point_layer",
+    "feature_point",
+    "loads_feature_line",
+    "parse_bbox",
+    "point_feature",
+    "tile_bounds",
+    "tile_cell",
+    "tile_center",
+    "tile_pixel",
+    "tile_range",
+]
@@ -0,0 +1,52 @@
+from __future__ import annotations
+
+import json
+from typing import Any
+
+
+FEATURE_COLLECTION_HEADER = '{"type":"FeatureCollection","features":['
+FEATURE_COLLECTION_FOOTER = "]}"
+
+
+def point_feature(
+    point: tuple[float, float] | None,
+    properties: dict[str, Any],
+) -> dict:
+    geometry = None
+    if point is not None:
+        geometry = {"type": "Point", "coordinates": [point[1], point[0]]}
+    return {"type": "Feature", "geometry": geometry, "properties": properties}
+
+
+def feature_point(feature: Any) -> tuple[float, float, dict[str, Any]] | None:
+    if not isinstance(feature, dict) or feature.get("type") != "Feature":
+        return None
+    geometry = feature.get("geometry")
+    if not isinstance(geometry, dict) or geometry.get("type") != "Point":
+        return None
+    coordinates = geometry.get("coordinates")
+    if not isinstance(coordinates, list) or len(coordinates) < 2:
+        return None
+    lon, lat = coordinates[0], coordinates[1]
+    if not isinstance(lat, (int, float)) or not isinstance(lon, (int, float)):
+        return None
+    if not -90 <= lat <= 90 or not -180 <= lon <= 180:
+        return None
+    properties = feature.get("properties")
+    if not isinstance(properties, dict):
+        properties = {}
+    return float(lat), float(lon), properties
+
+
+def dumps_feature(feature: dict) -> str:
+    return json.dumps(feature, ensure_ascii=False, separators=(",", ":"))
+
+
+def loads_feature_line(line: str) -> dict | None:
+    line = line.strip()
+    if line in ("", FEATURE_COLLECTION_HEADER, FEATURE_COLLECTION_FOOTER):
+        return None
+    feature = json.loads(line.strip(","))
+    if not isinstance(feature, dict) or feature.get("type") != "Feature":
+        raise ValueError("Expected one GeoJSON Feature per line")
+    return feature
@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+import struct
+from collections.abc import Iterable
+from typing import Any
+
+
+MVT_EXTENT = 4096
+
+_POINT = 1
+_MOVE_TO = 1
+
+
+def encode_point_layer(
+    name: str,
+    features: Iterable[tuple[int, int, int, dict[str, Any]]],
+    extent: int = MVT_EXTENT,
+) -> bytes:
+    keys: dict[str, int] = {}
+    values: dict[tuple[str, Any], int] = {}
+    encoded_features = []
+    for px, py, feature_id, properties in features:
+        tags = []
+        for key, value in properties.items():
+            encoded = _encode_value(value)
+            if encoded is None:
+                continue
+            tags.append(keys.setdefault(key, len(keys)))
+            tags.append(values.setdefault(encoded, len(values)))
+        geometry = [_command(_MOVE_TO, 1), _zigzag(px), _zigzag(py)]
+        encoded_features.append(
+            _varint_field(1, feature_id)
+            + _packed_field(2, tags)
+            + _varint_field(3, _POINT)
+            + _packed_field(4, geometry)
+        )
+    if not encoded_features:
+        return b""
+
+    layer = _varint_field(15, 2) + _bytes_field(1, name.encode())
+    for feature in encoded_features:
+        layer += _bytes_field(2, feature)
+    for key in keys:
+        layer += _bytes_field(3, key.encode())
+    for value in values:
+        layer += _bytes_field(4, value[1])
+    layer += _varint_field(5, extent)
+    return _bytes_field(3, layer)
+
+
+def _encode_value(value: Any) -> tuple[str, bytes] | None:
+    if value is None:
+        return None
+    if isinstance(value, bool):
+        return "bool", _varint_field(7, int(value))
+    if isinstance(value, int):
+        if value < 0:
+            return "sint", _varint_field(6, _zigzag(value))
+        return "uint", _varint_field(5, value)
+    if isinstance(value, float):
+        return "double", _key(3, 1) + struct.pack("<d", value)
+    return "string", _bytes_field(1, str(value).encode())
+
+
+def _command(command_id: int, count: int) -> int:
+    return (command_id & 0x7) | (count << 3)
+
+
+def _zigzag(value: int) -> int:
+    return (value << 1) ^ (value >> 63)
+
+
+def _varint(value: int) -> bytes:
+    out = bytearray()
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if value:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return bytes(out)
+
+
+def _key(field: int, wire_type: int) -> bytes:
+    return _varint((field << 3) | wire_type)
+
+
+def _varint_field(field: int, value: int) -> bytes:
+    return _key(field, 0) + _varint(value)
+
+
+def _bytes_field(field: int, data: bytes) -> bytes:
+    return _key(field, 2) + _varint(len(data)) + data
+
+
+def _packed_field(field: int, items: list[int]) -> bytes:
+    return _bytes_field(field, b"".join(_varint(item) for item in items))
@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+import math
+
+
+MAX_LATITUDE = 85.05112878
+
+
+def tile_cell(lat: float, lon: float, zoom: int) -> tuple[int, int]:
+    lat = max(-MAX_LATITUDE, min(MAX_LATITUDE, lat))
+    lon = max(-180.0, min(180.0, lon))
+    scale = 1 << zoom
+    lat_rad = math.radians(lat)
+    x = int((lon + 180.0) / 360.0 * scale)
+    y = int(
+        (1.0 - math.log(math.tan(lat_rad) + 1.0 / math.cos(lat_rad)) / math.pi)
+        / 2.0
+        * scale
+    )
+    return min(x, scale - 1), min(max(y, 0), scale - 1)
+
+
+def tile_center(x: int, y: int, zoom: int) -> tuple[float, float]:
+    scale = 1 << zoom
+    lon = (x + 0.5) / scale * 360.0 - 180.0
+    lat = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * (y + 0.5) / scale))))
+    return lat, lon
+
+
+def tile_bounds(x: int, y: int, zoom: int) -> tuple[float, float, float, float]:
+    scale = 1 << zoom
+    west = x / scale * 360.0 - 180.0
+    east = (x + 1) / scale * 360.0 - 180.0
+    north = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * y / scale))))
+    south = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * (y + 1) / scale))))
+    return west, south, east, north
+
+
+def tile_pixel(
+    lat: float,
+    lon: float,
+    zoom: int,
+    x: int,
+    y: int,
+    extent: int,
+) -> tuple[int, int]:
+    lat = max(-MAX_LATITUDE, min(MAX_LATITUDE, lat))
+    scale = 1 << zoom
+    lat_rad = math.radians(lat)
+    world_x = (lon + 180.0) / 360.0 * scale
+    world_y = (
+        (1.0 - math.log(math.tan(lat_rad) + 1.0 / math.cos(lat_rad)) / math.pi)
+        / 2.0
+        * scale
+    )
+    return round((world_x - x) * extent), round((world_y - y) * extent)
+
+
+def tile_range(
+    bbox: tuple[float, float, float, float],
+    zoom: int,
+) -> tuple[int, int, int, int]:
+    west, south, east, north = bbox
+    min_x, min_y = tile_cell(north, west, zoom)
+    max_x, max_y = tile_cell(south, east, zoom)
+    return min_x, min_y, max_x, max_y
+
+
+def parse_bbox(value: str) -> tuple[float, float, float, float]:
+    try:
+        west, south, east, north = (float(part) for part in value.split(","))
+    except ValueError as exc:
+        raise ValueError("bbox must be west,south,east,north") from exc
+    if not all(math.isfinite(part) for part in (west, south, east, north)):
+        raise ValueError("bbox must contain finite numbers")
+    if west > east or south > north:
+        raise ValueError("bbox must be west,south,east,north")
+    return clamp_bbox((west, south, east, north))
+
+
+def clamp_bbox(
+    bbox: tuple[float, float, float, float],
+) -> tuple[float, float, float, float]:
+    west, south, east, north = bbox
+    return (
+        max(-180.0, west),
+        max(-MAX_LATITUDE, south),
+        min(180.0, east),
+        min(MAX_LATITUDE, north),
+    )
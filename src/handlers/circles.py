@@ -94,8 +94,10 @@ async def handle_location(message: Message, state: FSMContext) -> None:
         display_name = (
             message.from_user.full_name or f"User {message.from_user.id}"
         )
+    chat_id = None if message.chat.type == "private" else message.chat.id
     record = CircleRecord(
         user_id=message.from_user.id,
+        chat_id=chat_id,
         data=record_date,
         location=location,
         type=record_type,
@@ -8,6 +8,8 @@ from src.auth import create_token
 from src.config import settings
 from src.keyboards import url_keyboard, webapp_keyboard
 from src.texts import (
+    GROUP_MAP_TEXT,
+    GROUP_MAP_UNAVAILABLE_TEXT,
     MAP_LOCAL_TEXT,
     MAP_OPEN_TEXT,
     MAP_URL_TEXT,
@@ -55,6 +57,36 @@ async def open_map(message: Message) -> None:
     )
 
 
+@router.message(Command("groupmap"))
+async def open_group_map(message: Message) -> None:
+    base_url = settings.webapp_url.strip().rstrip("/")
+    if not base_url:
+        await message.answer(WEBAPP_URL_MISSING)
+        return
+    chat_id = message.chat.id
+    if message.chat.type == "private" or (
+        settings.chat_id is not None and chat_id != settings.chat_id
+    ):
+        await message.answer(GROUP_MAP_UNAVAILABLE_TEXT)
+        return
+    token = create_token(
+        chat_id,
+        settings.jwt_secret,
+        settings.jwt_ttl_seconds,
+        scope="chat",
+    )
+    url = f"{base_url}/chat/{chat_id}?token={token}"
+
+    if _is_local_url(base_url):
+        await message.answer(MAP_LOCAL_TEXT.format(url=url))
+        return
+
+    await message.answer(
+        GROUP_MAP_TEXT,
+        reply_markup=url_keyboard(url),
+    )
+
+
 def _is_local_url(url: str) -> bool:
     try:
         host = urlparse(url).hostname or ""
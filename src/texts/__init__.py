@@ -1,5 +1,7 @@
 from src.texts.common import (
     ASK_LOCATION_TEXT,
+    GROUP_MAP_TEXT,
+    GROUP_MAP_UNAVAILABLE_TEXT,
     MAP_LOCAL_TEXT,
     MAP_OPEN_TEXT,
     MAP_URL_TEXT,
@@ -13,6 +15,8 @@ from src.texts.common import (
 
 __all__ = [
     "ASK_LOCATION_TEXT",
+    "GROUP_MAP_TEXT",
+    "GROUP_MAP_UNAVAILABLE_TEXT",
     "MAP_LOCAL_TEXT",
     "MAP_OPEN_TEXT",
     "MAP_URL_TEXT",
@@ -8,6 +8,8 @@ MAP_LOCAL_TEXT = (
     "Локальная версия откроется во внешнем браузере. "
     "Для WebApp нужен HTTPS.\n<a href=\"{url}\">{url}</a>"
 )
+GROUP_MAP_TEXT = "Открой общую карту чата."
+GROUP_MAP_UNAVAILABLE_TEXT = "Общая карта доступна только в чате группы."
 
 ASK_LOCATION_TEXT = "Где снят файл? Поделись геопозицией."
 MISSING_MEDIA_TEXT = "Не нашел кружок в ожидании. Пришли кружок заново."
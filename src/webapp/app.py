@@ -1,13 +1,22 @@
 from __future__ import annotations
 
-from collections.abc import AsyncGenerator
+import json
+import time
+from collections.abc import AsyncGenerator, AsyncIterator
 from contextlib import asynccontextmanager
+from datetime import date, datetime, time, timedelta, timezone
 from pathlib import Path
+from typing import Annotated
 from urllib.parse import urlencode
 
 import httpx
-from fastapi import Depends, FastAPI, HTTPException
-from fastapi.responses import HTMLResponse, PlainTextResponse, StreamingResponse
+from fastapi import Depends, FastAPI, HTTPException, Query
+from fastapi.responses import (
+    HTMLResponse,
+    PlainTextResponse,
+    Response,
+    StreamingResponse,
+)
 from fastapi.templating import Jinja2Templates
 from pydantic import BaseModel, Field
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -15,30 +24,108 @@ from starlette.requests import Request
 
 from src.auth import TokenError, verify_token
 from src.config import settings
-from src.db.crud import delete_circle, get_circle, list_circles
-from src.db.database import get_session, start_db
+from src.db.crud import (
+    bump_user_version,
+    count_circles,
+    delete_circle,
+    delete_circles,
+    existing_circle_ids,
+    get_circle,
+    get_user_version,
+    heatmap_cells,
+    import_circles,
+    list_chat_circles,
+    list_chat_clusters,
+    list_circles,
+    list_circles_in_bbox,
+    postgis_available,
+    postgis_tile,
+    record_point,
+    stream_circles,
+    timeline_counts,
+    update_circle_description,
+    update_circle_descriptions,
+)
+from src.db.database import SessionLocal, get_session, start_db
+from src.db.models import CircleRecord
+from src.geo import (
+    FEATURE_COLLECTION_FOOTER,
+    FEATURE_COLLECTION_HEADER,
+    MVT_EXTENT,
+    dumps_feature,
+    encode_point_layer,
+    feature_point,
+    loads_feature_line,
+    parse_bbox,
+    point_feature,
+    tile_bounds,
+    tile_center,
+    tile_pixel,
+    tile_range,
+)
+from src.webapp.cache import VersionedCache
 
 
 TEMPLATES_DIR = Path(__file__).resolve().parent / "templates"
 templates = Jinja2Templates(directory=str(TEMPLATES_DIR))
 TELEGRAM_API_BASE = "https://api.telegram.org"
+CLUSTER_ZOOM_OFFSET = 2
+HEATMAP_ZOOM_OFFSET = 3
+HEATMAP_MAX_ZOOM = 22
+TILE_MAX_ZOOM = 22
+TILE_BUFFER = 64
+TILE_LAYER = "markers"
+TILE_MARKER_THRESHOLD = 2000
+TILE_DETAIL_ZOOM = 12
+TILE_CLUSTER_ZOOM_OFFSET = 5
+USERNAME_TTL_SECONDS = 3600
+MVT_MEDIA_TYPE = "application/vnd.mapbox-vector-tile"
+BATCH_LIMIT = 1000
+EXPORT_CHUNK_LINES = 500
+IMPORT_BATCH_SIZE = 5000
+MAX_IMPORT_LINE_BYTES = 1 << 20
+EXPORT_MEDIA_TYPES = {
+    "geojson": "application/geo+json",
+    "ndjson": "application/x-ndjson",
+}
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
     await start_db()
+    async with SessionLocal() as session:
+        app.state.postgis = await postgis_available(session)
     async with httpx.AsyncClient(timeout=30.0) as client:
         app.state.http_client = client
         yield
 
 
 app = FastAPI(lifespan=lifespan)
+aggregate_cache = VersionedCache()
+tile_cache = VersionedCache(max_entries=4096)
+username_cache = VersionedCache()
 
 
 class DescriptionPayload(BaseModel):
     description: str = Field(default="", max_length=2000)
 
 
+RecordId = Annotated[int, Field(ge=1, le=2**31 - 1)]
+
+
+class BatchDeletePayload(BaseModel):
+    ids: list[RecordId] = Field(min_length=1, max_length=BATCH_LIMIT)
+
+
+class BatchDescriptionItem(BaseModel):
+    id: RecordId
+    description: str = Field(default="", max_length=2000)
+
+
+class BatchDescriptionPayload(BaseModel):
+    items: list[BatchDescriptionItem] = Field(min_length=1, max_length=BATCH_LIMIT)
+
+
 @app.get("/", response_class=PlainTextResponse)
 async def index() -> PlainTextResponse:
     return PlainTextResponse("Use your personal link /<user_id>?token=...")
@@ -49,14 +136,39 @@ async def user_index(
     request: Request,
     user_id: int,
     token: str | None = None,
+    session: AsyncSession = Depends(get_session),
 ) -> HTMLResponse:
     _validate_token(token, user_id)
+    total = await count_circles(session, user_id)
     return templates.TemplateResponse(
         "index.html",
         {
             "request": request,
             "user_id": user_id,
+            "chat_id": None,
+            "token": token,
+            "use_tiles": total > TILE_MARKER_THRESHOLD,
+            "marker_total": total,
+        },
+    )
+
+
+@app.get("/chat/{chat_id}", response_class=HTMLResponse)
+async def chat_index(
+    request: Request,
+    chat_id: int,
+    token: str | None = None,
+) -> HTMLResponse:
+    _validate_token(token, chat_id, scope="chat")
+    return templates.TemplateResponse(
+        "index.html",
+        {
+            "request": request,
+            "user_id": None,
+            "chat_id": chat_id,
             "token": token,
+            "use_tiles": False,
+            "marker_total": 0,
         },
     )
 
@@ -65,18 +177,34 @@ async def user_index(
 async def markers(
     user_id: int,
     token: str,
+    q: str | None = Query(default=None, max_length=200),
+    date_from: date | None = None,
+    date_to: date | None = None,
+    media_type: str | None = Query(default=None, alias="type", max_length=32),
     session: AsyncSession = Depends(get_session),
 ) -> list[dict]:
     _validate_token(token, user_id)
-    records = await list_circles(session, user_id)
+    records = await list_circles(
+        session,
+        user_id,
+        search=q.strip() if q else None,
+        date_from=_day_start(date_from) if date_from else None,
+        date_before=_day_after(date_to) if date_to else None,
+        media_type=media_type,
+    )
     payload = []
     updated = False
     auth_query = urlencode({"user_id": user_id, "token": token})
+    resolved_names: dict[int, str | None] = {}
     for record in records:
         username = record.username
         needs_lookup = not username or not username.startswith("@")
         if needs_lookup:
-            resolved = await _fetch_telegram_username(record.user_id)
+            if record.user_id not in resolved_names:
+                resolved_names[record.user_id] = await _resolve_username(
+                    record.user_id
+                )
+            resolved = resolved_names[record.user_id]
             if resolved and resolved != record.username:
                 record.username = resolved
                 updated = True
@@ -84,23 +212,107 @@ async def markers(
         if not username:
             username = f"User {record.user_id}"
         payload.append(
-            {
-                "id": record.id,
-                "user_id": record.user_id,
-                "data": record.data.isoformat() if record.data else None,
-                "location": record.location,
-                "type": record.type,
-                "media_id": record.media_id,
-                "username": username,
-                "description": record.description,
-                "media_url": f"/api/media/{record.id}?{auth_query}",
-            }
+            _marker_payload(
+                record,
+                username,
+                f"/api/media/{record.id}?{auth_query}",
+            )
         )
     if updated:
+        await bump_user_version(session, user_id)
         await session.commit()
     return payload
 
 
+@app.get("/api/chats/{chat_id}/clusters")
+async def chat_clusters(
+    chat_id: int,
+    token: str,
+    bbox: str,
+    zoom: int = Query(ge=0, le=22),
+    session: AsyncSession = Depends(get_session),
+) -> list[dict]:
+    _validate_token(token, chat_id, scope="chat")
+    cells = await list_chat_clusters(
+        session,
+        chat_id,
+        zoom + CLUSTER_ZOOM_OFFSET,
+        _parse_bbox(bbox),
+    )
+    return [
+        {
+            "lat": cell.lat_sum / cell.count,
+            "lon": cell.lon_sum / cell.count,
+            "count": cell.count,
+            "zoom": cell.zoom,
+            "x": cell.x,
+            "y": cell.y,
+        }
+        for cell in cells
+    ]
+
+
+@app.get("/api/chats/{chat_id}/markers")
+async def chat_markers(
+    chat_id: int,
+    token: str,
+    bbox: str,
+    limit: int = Query(default=500, ge=1, le=2000),
+    session: AsyncSession = Depends(get_session),
+) -> list[dict]:
+    _validate_token(token, chat_id, scope="chat")
+    records = await list_chat_circles(session, chat_id, _parse_bbox(bbox), limit)
+    auth_query = urlencode({"token": token})
+    return [
+        _marker_payload(
+            record,
+            record.username or f"User {record.user_id}",
+            f"/api/chats/{chat_id}/media/{record.id}?{auth_query}",
+        )
+        for record in records
+    ]
+
+
+@app.post("/api/markers/batch/delete")
+async def delete_markers(
+    payload: BatchDeletePayload,
+    user_id: int,
+    token: str,
+    session: AsyncSession = Depends(get_session),
+) -> dict:
+    _validate_token(token, user_id)
+    ids = list(dict.fromkeys(payload.ids))
+    deleted = await delete_circles(session, user_id, ids)
+    statuses = await _batch_statuses(session, ids, deleted, "deleted")
+    return {
+        "status": "ok",
+        "deleted": len(deleted),
+        "results": [
+            {"id": record_id, "status": statuses[record_id]} for record_id in ids
+        ],
+    }
+
+
+@app.patch("/api/markers/batch/description")
+async def update_descriptions(
+    payload: BatchDescriptionPayload,
+    user_id: int,
+    token: str,
+    session: AsyncSession = Depends(get_session),
+) -> dict:
+    _validate_token(token, user_id)
+    descriptions = {item.id: item.description.strip() for item in payload.items}
+    updated = await update_circle_descriptions(session, user_id, descriptions)
+    statuses = await _batch_statuses(session, list(descriptions), set(updated), "ok")
+    results = []
+    for record_id in descriptions:
+        result = {"id": record_id, "status": statuses[record_id]}
+        if record_id in updated:
+            result["description"] = updated[record_id]
+        results.append(result)
+    return {"status": "ok", "updated": len(updated), "results": results}
+
+
 @app.delete("/api/markers/{record_id}")
 async def delete_marker(
     record_id: int,
@@ -132,11 +344,159 @@ async def update_description(
         raise HTTPException(status_code=404, detail="Record not found.")
     if record.user_id != user_id:
         raise HTTPException(status_code=403, detail="Forbidden.")
-    record.description = payload.description.strip()
-    await session.commit()
+    await update_circle_description(session, record, payload.description.strip())
     return {"status": "ok", "description": record.description}
 
 
+@app.get("/api/heatmap")
+async def heatmap(
+    user_id: int,
+    token: str,
+    bbox: str,
+    zoom: int = Query(ge=0, le=HEATMAP_MAX_ZOOM),
+    session: AsyncSession = Depends(get_session),
+) -> dict:
+    _validate_token(token, user_id)
+    cell_zoom = min(zoom + HEATMAP_ZOOM_OFFSET, HEATMAP_MAX_ZOOM)
+    bounds = _parse_bbox(bbox)
+    version = await get_user_version(session, user_id)
+    cell_range = tile_range(bounds, cell_zoom)
+    key = ("heatmap", user_id, version, cell_zoom, cell_range)
+    cached = aggregate_cache.get(key)
+    if cached is not None:
+        return cached
+    cells = []
+    peak = 0
+    for x, y, count in await heatmap_cells(session, user_id, cell_zoom, cell_range):
+        lat, lon = tile_center(x, y, cell_zoom)
+        cells.append([round(lat, 6), round(lon, 6), count])
+        peak = max(peak, count)
+    payload = {"zoom": cell_zoom, "max": peak, "cells": cells}
+    aggregate_cache.set(key, payload)
+    return payload
+
+
+@app.get("/api/timeline")
+async def timeline(
+    user_id: int,
+    token: str,
+    bucket: str = Query(default="day", pattern="^(day|week|month)$"),
+    session: AsyncSession = Depends(get_session),
+) -> dict:
+    _validate_token(token, user_id)
+    version = await get_user_version(session, user_id)
+    key = ("timeline", user_id, version, bucket)
+    cached = aggregate_cache.get(key)
+    if cached is not None:
+        return cached
+    periods = []
+    counts = []
+    for period, count in await timeline_counts(session, user_id, bucket):
+        periods.append(period.date().isoformat())
+        counts.append(count)
+    payload = {"bucket": bucket, "periods": periods, "counts": counts}
+    aggregate_cache.set(key, payload)
+    return payload
+
+
+@app.get("/tiles/{z}/{x}/{y}.mvt")
+async def marker_tile(
+    request: Request,
+    z: int,
+    x: int,
+    y: int,
+    user_id: int,
+    token: str,
+    session: AsyncSession = Depends(get_session),
+) -> Response:
+    _validate_token(token, user_id)
+    if not 0 <= z <= TILE_MAX_ZOOM or not (0 <= x < 1 << z and 0 <= y < 1 << z):
+        raise HTTPException(status_code=404, detail="Tile not found.")
+    version = await get_user_version(session, user_id)
+    headers = {"ETag": f'"{version}"', "Cache-Control": "private, no-cache"}
+    if request.headers.get("if-none-match") == headers["ETag"]:
+        return Response(status_code=304, headers=headers)
+    key = ("tile", user_id, version, z, x, y)
+    content = tile_cache.get(key)
+    if content is None:
+        content = await _render_tile(session, user_id, z, x, y)
+        tile_cache.set(key, content)
+    return Response(content, media_type=MVT_MEDIA_TYPE, headers=headers)
+
+
+@app.get("/api/export")
+async def export_markers(
+    user_id: int,
+    token: str,
+    export_format: str = Query(
+        default="ndjson",
+        alias="format",
+        pattern="^(geojson|ndjson)$",
+    ),
+) -> StreamingResponse:
+    _validate_token(token, user_id)
+    scope = None if _is_admin(user_id) else user_id
+    return StreamingResponse(
+        _export_chunks(scope, export_format),
+        media_type=EXPORT_MEDIA_TYPES[export_format],
+        headers={
+            "Content-Disposition": (
+                f'attachment; filename="memorio-{user_id}.{export_format}"'
+            )
+        },
+    )
+
+
+@app.post("/api/import")
+async def import_markers(
+    request: Request,
+    user_id: int,
+    token: str,
+    session: AsyncSession = Depends(get_session),
+) -> dict:
+    _validate_token(token, user_id)
+    is_admin = _is_admin(user_id)
+    imported = 0
+    skipped = 0
+    seen = 0
+    staged = 0
+    batch: list[tuple] = []
+    async for line in _iter_lines(request):
+        try:
+            feature = loads_feature_line(line)
+        except ValueError as exc:
+            if not seen:
+                raise HTTPException(
+                    status_code=422,
+                    detail=(
+                        "Unsupported import format: expected NDJSON or an "
+                        "exported GeoJSON file with one feature per line."
+                    ),
+                ) from exc
+            skipped += 1
+            continue
+        if feature is None:
+            continue
+        seen += 1
+        row = _import_row(feature, user_id, is_admin)
+        if row is None:
+            skipped += 1
+            continue
+        batch.append(row)
+        staged += 1
+        if len(batch) >= IMPORT_BATCH_SIZE:
+            imported += await import_circles(session, batch)
+            batch = []
+    imported += await import_circles(session, batch)
+    await session.commit()
+    return {
+        "status": "ok",
+        "imported": imported,
+        "duplicates": staged - imported,
+        "skipped": skipped,
+    }
+
+
 @app.get("/api/media/{record_id}")
 async def media(
     record_id: int,
@@ -153,7 +513,29 @@ async def media(
         raise HTTPException(status_code=404, detail="Media not found.")
     if record.user_id != user_id:
         raise HTTPException(status_code=403, detail="Forbidden.")
+    return await _stream_media(record)
+
+
+@app.get("/api/chats/{chat_id}/media/{record_id}")
+async def chat_media(
+    record_id: int,
+    chat_id: int,
+    token: str,
+    session: AsyncSession = Depends(get_session),
+) -> StreamingResponse:
+    _validate_token(token, chat_id, scope="chat")
+    if not settings.bot_token:
+        raise HTTPException(status_code=500, detail="Bot token is not configured.")
+
+    record = await get_circle(session, record_id)
+    if not record:
+        raise HTTPException(status_code=404, detail="Media not found.")
+    if record.chat_id != chat_id:
+        raise HTTPException(status_code=403, detail="Forbidden.")
+    return await _stream_media(record)
 
+
+async def _stream_media(record: CircleRecord) -> StreamingResponse:
     file_path = await _get_file_path(record.media_id)
     file_url = f"{TELEGRAM_API_BASE}/file/bot{settings.bot_token}/{file_path}"
     response = await _fetch_file(file_url)
@@ -170,6 +552,15 @@ async def _get_file_path(file_id: str) -> str:
     return payload["result"]["file_path"]
 
 
+async def _resolve_username(user_id: int) -> str | None:
+    key = ("username", user_id, int(time.time() // USERNAME_TTL_SECONDS))
+    cached = username_cache.get(key)
+    if cached is None:
+        cached = await _fetch_telegram_username(user_id) or ""
+        username_cache.set(key, cached)
+    return cached or None
+
+
 async def _fetch_telegram_username(user_id: int) -> str | None:
     if not settings.bot_token:
         return None
@@ -209,7 +600,225 @@ async def _fetch_json(url: str, params: dict | None = None) -> dict | None:
         return None
 
 
-def _validate_token(token: str | None, user_id: int) -> None:
+async def _render_tile(
+    session: AsyncSession,
+    user_id: int,
+    z: int,
+    x: int,
+    y: int,
+) -> bytes:
+    west, south, east, north = tile_bounds(x, y, z)
+    pad_x = (east - west) * TILE_BUFFER / MVT_EXTENT
+    pad_y = (north - south) * TILE_BUFFER / MVT_EXTENT
+    bbox = (west - pad_x, south - pad_y, east + pad_x, north + pad_y)
+    if z < TILE_DETAIL_ZOOM:
+        return await _render_cluster_tile(session, user_id, z, x, y, bbox)
+    if app.state.postgis:
+        return await postgis_tile(
+            session, user_id, z, x, y, bbox, TILE_LAYER, MVT_EXTENT
+        )
+    features = []
+    for record in await list_circles_in_bbox(session, user_id, bbox):
+        point = record_point(record.location)
+        if point is None:
+            continue
+        px, py = tile_pixel(point[0], point[1], z, x, y, MVT_EXTENT)
+        features.append(
+            (
+                px,
+                py,
+                record.id,
+                {
+                    "id": record.id,
+                    "type": record.type,
+                    "data": record.data.isoformat() if record.data else None,
+                    "username": record.username,
+                    "description": record.description,
+                },
+            )
+        )
+    return encode_point_layer(TILE_LAYER, features, MVT_EXTENT)
+
+
+async def _render_cluster_tile(
+    session: AsyncSession,
+    user_id: int,
+    z: int,
+    x: int,
+    y: int,
+    bbox: tuple[float, float, float, float],
+) -> bytes:
+    cell_zoom = z + TILE_CLUSTER_ZOOM_OFFSET
+    features = []
+    cell_range = tile_range(bbox, cell_zoom)
+    for cell_x, cell_y, count in await heatmap_cells(
+        session, user_id, cell_zoom, cell_range
+    ):
+        lat, lon = tile_center(cell_x, cell_y, cell_zoom)
+        px, py = tile_pixel(lat, lon, z, x, y, MVT_EXTENT)
+        feature_id = (cell_y << cell_zoom) + cell_x + 1
+        features.append((px, py, feature_id, {"count": count}))
+    return encode_point_layer(TILE_LAYER, features, MVT_EXTENT)
+
+
+async def _export_chunks(
+    user_id: int | None,
+    export_format: str,
+) -> AsyncIterator[str]:
+    geojson = export_format == "geojson"
+    if geojson:
+        yield FEATURE_COLLECTION_HEADER + "\n"
+    lines: list[str] = []
+    first = True
+    async with SessionLocal() as session:
+        async for record in stream_circles(session, user_id):
+            point = record_point(record.location)
+            properties = _feature_properties(record)
+            if point is None:
+                properties["location"] = record.location
+            line = dumps_feature(point_feature(point, properties))
+            if geojson and not first:
+                line = "," + line
+            first = False
+            lines.append(line + "\n")
+            if len(lines) >= EXPORT_CHUNK_LINES:
+                yield "".join(lines)
+                lines = []
+    if lines:
+        yield "".join(lines)
+    if geojson:
+        yield FEATURE_COLLECTION_FOOTER + "\n"
+
+
+async def _iter_lines(request: Request) -> AsyncIterator[str]:
+    buffer = b""
+    async for chunk in request.stream():
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        if len(buffer) > MAX_IMPORT_LINE_BYTES:
+            raise HTTPException(status_code=413, detail="Import line too long.")
+        for line in lines:
+            yield line.decode("utf-8", errors="replace")
+    if buffer:
+        yield buffer.decode("utf-8", errors="replace")
+
+
+def _feature_properties(record: CircleRecord) -> dict:
+    return {
+        "id": record.id,
+        "user_id": record.user_id,
+        "chat_id": record.chat_id,
+        "data": record.data.isoformat() if record.data else None,
+        "type": record.type,
+        "media_id": record.media_id,
+        "username": record.username,
+        "description": record.description,
+    }
+
+
+def _import_row(feature: dict, user_id: int, is_admin: bool) -> tuple | None:
+    point = feature_point(feature)
+    if point is None:
+        return None
+    lat, lon, properties = point
+    media_id = properties.get("media_id")
+    if not isinstance(media_id, str) or not media_id or len(media_id) > 256:
+        return None
+    record_type = properties.get("type") or "video_note"
+    if not isinstance(record_type, str) or len(record_type) > 32:
+        return None
+    username = properties.get("username")
+    if not isinstance(username, str) or len(username) > 128:
+        username = None
+    description = properties.get("description")
+    if not isinstance(description, str):
+        description = ""
+    owner_id = user_id
+    chat_id = None
+    if is_admin:
+        owner_id = _int_property(properties, "user_id") or user_id
+        chat_id = _int_property(properties, "chat_id")
+    return (
+        owner_id,
+        chat_id,
+        _parse_datetime(properties.get("data")),
+        json.dumps({"lat": lat, "lon": lon}),
+        record_type,
+        media_id,
+        username,
+        description.strip()[:2000],
+    )
+
+
+def _int_property(properties: dict, key: str) -> int | None:
+    value = properties.get(key)
+    if isinstance(value, bool) or not isinstance(value, int):
+        return None
+    return value
+
+
+def _parse_datetime(value: object) -> datetime | None:
+    if not isinstance(value, str):
+        return None
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+
+def _day_start(day: date) -> datetime:
+    return datetime.combine(day, time.min, tzinfo=timezone.utc)
+
+
+def _day_after(day: date) -> datetime | None:
+    if day == date.max:
+        return None
+    return _day_start(day + timedelta(days=1))
+
+
+def _is_admin(user_id: int) -> bool:
+    return settings.admin_id is not None and user_id == settings.admin_id
+
+
+async def _batch_statuses(
+    session: AsyncSession,
+    ids: list[int],
+    applied: set[int],
+    applied_status: str,
+) -> dict[int, str]:
+    missing = [record_id for record_id in ids if record_id not in applied]
+    existing = await existing_circle_ids(session, missing)
+    statuses = {record_id: applied_status for record_id in applied}
+    for record_id in missing:
+        statuses[record_id] = "forbidden" if record_id in existing else "not_found"
+    return statuses
+
+
+def _marker_payload(record: CircleRecord, username: str, media_url: str) -> dict:
+    return {
+        "id": record.id,
+        "user_id": record.user_id,
+        "data": record.data.isoformat() if record.data else None,
+        "location": record.location,
+        "type": record.type,
+        "media_id": record.media_id,
+        "username": username,
+        "description": record.description,
+        "media_url": media_url,
+    }
+
+
+def _parse_bbox(value: str) -> tuple[float, float, float, float]:
+    try:
+        return parse_bbox(value)
+    except ValueError as exc:
+        raise HTTPException(status_code=422, detail=str(exc)) from exc
+
+
+def _validate_token(token: str | None, user_id: int, scope: str = "user") -> None:
     if not token:
         raise HTTPException(status_code=401, detail="Token required.")
     try:
@@ -218,3 +827,5 @@ def _validate_token(token: str | None, user_id: int) -> None:
         raise HTTPException(status_code=401, detail=str(exc)) from exc
     if str(payload.get("sub")) != str(user_id):
         raise HTTPException(status_code=401, detail="Invalid token subject.")
+    if payload.get("scope", "user") != scope:
+        raise HTTPException(status_code=401, detail="Invalid token scope.")